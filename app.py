@@ -1,11 +1,53 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import io
 import os.path
-from utils import validate_search_console_csv, process_search_data, compare_domains
+from collections import Counter
+from utils import (
+    compare_domains,
+    summarize_search_data,
+    combine_summaries,
+    sum_by_group,
+    safe_percentage,
+)
+from sample_loader import SAMPLE_FILES, store_file_data, load_samples
+import charts
+
+# Percentages stay numeric so tables sort them correctly; the frontend formats them
+PERCENT_COLUMN = st.column_config.NumberColumn(format='%.2f%%')
+
+def _domain_frame(selected_domain: str) -> pd.DataFrame:
+    """
+    Returns the prebuilt combined data for a domain (or all domains) from session state.
+    
+    Args:
+        selected_domain (str): Domain to include, or "All Domains"
+        
+    Returns:
+        DataFrame: The combined data, empty if the domain has no data
+    """
+    if selected_domain == "All Domains":
+        return st.session_state.combined_all
+    return st.session_state.combined_by_domain.get(selected_domain, pd.DataFrame())
+
+def _filter_by_url(selected_domain: str, url_path: str) -> tuple[pd.DataFrame, dict]:
+    """
+    Filters the combined data for a domain (or all domains) by URL path.
+    
+    Not cached: the substring test runs once per distinct page on the categorical
+    page_lower column, which is cheaper than pickling the filtered frame in and out.
+    
+    Args:
+        selected_domain (str): Domain to include, or "All Domains"
+        url_path (str): Substring to filter pages by
+        
+    Returns:
+        tuple: (filtered_df, summary) - Filtered DataFrame and its headline metrics
+    """
+    combined_df = _domain_frame(selected_domain)
+    combined_df = combined_df[combined_df['page_lower'].str.contains(url_path.lower(), regex=False, na=False)]
+    
+    return combined_df, summarize_search_data(combined_df)
 
 # Page configuration
 st.set_page_config(
@@ -28,51 +70,29 @@ if 'domains' not in st.session_state:
     st.session_state.domains = []
 if 'comparison_data' not in st.session_state:
     st.session_state.comparison_data = None
+if 'combined_all' not in st.session_state:
+    st.session_state.combined_all = pd.DataFrame()
+if 'combined_by_domain' not in st.session_state:
+    st.session_state.combined_by_domain = {}
     
 # Auto-load sample data if available and no data is uploaded yet
 if not st.session_state.uploaded_files_data:
-    sample_files = ["sample_data.csv", "sample_data_domain2.csv"]
-    all_exist = all(os.path.exists(file) for file in sample_files)
+    all_exist = all(os.path.exists(file) for file in SAMPLE_FILES)
     
     if all_exist:
         with st.spinner("Loading sample data for demonstration..."):
-            for file_name in sample_files:
-                try:
-                    # Read the file
-                    df = pd.read_csv(file_name)
-                    
-                    # Validate and process
-                    is_valid, message = validate_search_console_csv(df)
-                    
-                    if is_valid:
-                        # Process the data
-                        domain, processed_data = process_search_data(df)
-                        
-                        if domain not in st.session_state.domains:
-                            st.session_state.domains.append(domain)
-                        
-                        # Store the processed data
-                        st.session_state.uploaded_files_data[file_name] = {
-                            'domain': domain,
-                            'data': processed_data
-                        }
-                
-                except Exception as e:
-                    st.error(f"Error loading sample data: {str(e)}")
+            loaded, errors = load_samples()
+            
+            for file_name, message in errors:
+                st.error(f"Error loading sample data: {message}")
             
             if st.session_state.uploaded_files_data:
                 st.success("Sample data loaded for demonstration purposes.")
 
-# Create tabs for different functionalities
-tab1, tab2, tab3, tab4 = st.tabs([
-    "Upload & Analyze Data", 
-    "Keyword Analysis", 
-    "Domain/URL Analysis", 
-    "Comparison Analytics"
-])
-
 # Tab 1: Upload & Analyze Data
-with tab1:
+@st.fragment
+def render_tab1():
+    """Renders the Upload & Analyze Data tab; its widgets only rerun this fragment."""
     st.header("Upload Search Console Data")
     st.markdown("""
         Upload CSV files exported from Google Search Console. The files should contain:
@@ -88,85 +108,75 @@ with tab1:
     )
     
     if uploaded_files:
+        n_files = len(st.session_state.uploaded_files_data)
+        
         for uploaded_file in uploaded_files:
             # Process each file
             file_content = uploaded_file.read()
             
             try:
-                # Validate and process the file
-                df = pd.read_csv(io.BytesIO(file_content))
+                # Validate, process and store the file (cached across reruns)
+                domain, stored_name = store_file_data(uploaded_file.name, file_content)
                 
-                # Check if it's a valid Search Console export
-                is_valid, message = validate_search_console_csv(df)
-                
-                if is_valid:
-                    # Process the data
-                    domain, processed_data = process_search_data(df)
-                    
-                    if domain not in st.session_state.domains:
-                        st.session_state.domains.append(domain)
-                    
-                    # Store the processed data
-                    st.session_state.uploaded_files_data[uploaded_file.name] = {
-                        'domain': domain,
-                        'data': processed_data
-                    }
-                    
-                    st.success(f"Successfully processed {uploaded_file.name} for domain: {domain}")
+                if stored_name != uploaded_file.name:
+                    st.info(f"{uploaded_file.name} has the same content as {stored_name}, which is already loaded for domain: {domain}")
                 else:
-                    st.error(f"Error processing {uploaded_file.name}: {message}")
+                    st.success(f"Successfully processed {uploaded_file.name} for domain: {domain}")
             
             except Exception as e:
                 st.error(f"Error processing {uploaded_file.name}: {str(e)}")
+        
+        # New files change the domains available to the other tabs, so rerun the whole app
+        if len(st.session_state.uploaded_files_data) != n_files:
+            st.rerun()
     
     # Display data summaries if available
     if st.session_state.uploaded_files_data:
         st.header("Data Overview")
         
         # Select file to analyze
-        file_names = list(st.session_state.uploaded_files_data.keys())
-        selected_file = st.selectbox("Select file to analyze:", file_names)
+        # Different files can share a name, so tag repeated names with their content digest
+        name_counts = Counter(
+            file_data['file_name'] for file_data in st.session_state.uploaded_files_data.values()
+        )
+        file_names = {
+            digest: (
+                f"{file_data['file_name']} ({digest[:6]})"
+                if name_counts[file_data['file_name']] > 1 else file_data['file_name']
+            )
+            for digest, file_data in st.session_state.uploaded_files_data.items()
+        }
+        selected_file = st.selectbox("Select file to analyze:", list(file_names), format_func=file_names.get)
         
         if selected_file:
             data = st.session_state.uploaded_files_data[selected_file]
             df = data['data']
             domain = data['domain']
+            summary = data['summary']
             
             # Display metrics
             st.subheader(f"Domain: {domain}")
             
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Queries", len(df))
+                st.metric("Total Queries", summary['n_queries'])
             with col2:
-                st.metric("Total Clicks", int(df['clicks'].sum()))
+                st.metric("Total Clicks", summary['total_clicks'])
             with col3:
-                st.metric("AI Overview Clicks", int(df['ai_overview_clicks'].sum()))
+                st.metric("AI Overview Clicks", summary['total_ai_clicks'])
             with col4:
-                if df['clicks'].sum() > 0:
-                    ai_click_percentage = (df['ai_overview_clicks'].sum() / df['clicks'].sum()) * 100
-                    st.metric("AI Overview %", f"{ai_click_percentage:.2f}%")
+                if summary['ai_pct'] is not None:
+                    st.metric("AI Overview %", f"{summary['ai_pct']:.2f}%")
                 else:
                     st.metric("AI Overview %", "N/A")
             
             # Top queries affected by AI Overview
             st.subheader("Top Queries Affected by AI Overview")
-            top_ai_queries = df.sort_values('ai_overview_clicks', ascending=False).head(10)
+            top_ai_queries = df.nlargest(10, 'ai_overview_clicks')
             
             if not top_ai_queries.empty:
                 # Create a horizontal bar chart
-                fig = px.bar(
-                    top_ai_queries,
-                    x='ai_overview_clicks',
-                    y='query',
-                    orientation='h',
-                    title="Top Queries by AI Overview Clicks",
-                    labels={'ai_overview_clicks': 'AI Overview Clicks', 'query': 'Query'},
-                    color='ai_overview_percentage',
-                    color_continuous_scale='Reds',
-                )
-                
-                fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+                fig = charts.top_ai_overview_bar(top_ai_queries, 'query', 'Query', "Top Queries by AI Overview Clicks")
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Display data table with more details
@@ -180,15 +190,18 @@ with tab1:
                     'position': 'Position'
                 })
                 
-                # Format the percentages
-                display_df['AI Overview %'] = display_df['AI Overview %'].apply(lambda x: f"{x:.2f}%")
-                
-                st.dataframe(display_df, use_container_width=True)
+                st.dataframe(
+                    display_df,
+                    use_container_width=True,
+                    column_config={'AI Overview %': PERCENT_COLUMN}
+                )
             else:
                 st.info("No AI Overview clicks data found in this dataset.")
 
 # Tab 2: Keyword Analysis
-with tab2:
+@st.fragment
+def render_tab2():
+    """Renders the Keyword Analysis tab; its widgets only rerun this fragment."""
     st.header("Single Keyword Analysis")
     
     # Check if we have any data uploaded
@@ -200,68 +213,61 @@ with tab2:
         
         if keyword:
             # Find this keyword across all uploaded files
-            keyword_data = []
+            frames = []
             
             for file_name, data in st.session_state.uploaded_files_data.items():
                 df = data['data']
                 domain = data['domain']
                 
                 # Find rows matching the keyword (case insensitive)
-                matches = df[df['query'].str.lower() == keyword.lower()]
+                positions = data['query_index'].get(keyword.lower())
                 
-                if not matches.empty:
-                    for _, row in matches.iterrows():
-                        keyword_data.append({
-                            'Domain': domain,
-                            'Clicks': row['clicks'],
-                            'Impressions': row['impressions'],
-                            'AI Overview Clicks': row['ai_overview_clicks'],
-                            'AI Overview %': f"{row['ai_overview_percentage']:.2f}%",
-                            'Position': row['position'],
-                            'CTR': f"{row['ctr']}%"
-                        })
+                if positions is not None:
+                    matches = df.iloc[positions][['clicks', 'impressions', 'ai_overview_clicks', 'ai_overview_percentage', 'position', 'ctr']].copy()
+                    matches.insert(0, 'domain', domain)
+                    frames.append(matches)
             
-            if keyword_data:
+            if frames:
                 st.subheader(f"Results for: '{keyword}'")
                 
-                # Convert to DataFrame for display
-                keyword_df = pd.DataFrame(keyword_data)
-                st.dataframe(keyword_df, use_container_width=True)
+                # Build the display DataFrame column-wise
+                keyword_df = pd.concat(frames, ignore_index=True).rename(columns={
+                    'domain': 'Domain',
+                    'clicks': 'Clicks',
+                    'impressions': 'Impressions',
+                    'ai_overview_clicks': 'AI Overview Clicks',
+                    'ai_overview_percentage': 'AI Overview %',
+                    'position': 'Position',
+                    'ctr': 'CTR'
+                })
+                
+                st.dataframe(
+                    keyword_df,
+                    use_container_width=True,
+                    column_config={
+                        'AI Overview %': PERCENT_COLUMN,
+                        'CTR': PERCENT_COLUMN
+                    }
+                )
                 
                 # Create comparison visualization
-                if len(keyword_data) > 1:
+                if len(keyword_df) > 1:
                     st.subheader("Domain Comparison for this Keyword")
                     
-                    fig = px.bar(
-                        keyword_df,
-                        x='Domain',
-                        y='AI Overview Clicks',
-                        title=f"AI Overview Clicks Comparison for '{keyword}'",
-                        color='Domain'
-                    )
+                    fig = charts.keyword_domain_bar(keyword_df, keyword)
                     st.plotly_chart(fig, use_container_width=True)
                 
                 # Position vs AI Overview visualization
-                if len(keyword_data) > 0:
-                    # Convert percentage string to float
-                    keyword_df['AI Overview % (numeric)'] = keyword_df['AI Overview %'].str.rstrip('%').astype(float)
-                    
-                    fig = px.scatter(
-                        keyword_df,
-                        x='Position',
-                        y='AI Overview % (numeric)',
-                        size='Clicks',
-                        color='Domain',
-                        hover_data=['Impressions', 'CTR'],
-                        labels={'AI Overview % (numeric)': 'AI Overview %'},
-                        title=f"Position vs AI Overview % for '{keyword}'"
-                    )
+                if len(keyword_df) > 0:
+                    fig = charts.keyword_position_scatter(keyword_df, keyword)
                     st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info(f"No data found for the keyword '{keyword}' in the uploaded files.")
 
 # Tab 3: Domain/URL Analysis
-with tab3:
+@st.fragment
+def render_tab3():
+    """Renders the Domain/URL Analysis tab; its widgets only rerun this fragment."""
     st.header("Domain & Page Analysis")
     
     if not st.session_state.uploaded_files_data:
@@ -275,32 +281,18 @@ with tab3:
         url_path = st.text_input("Enter URL path to analyze (leave empty for domain-level analysis):", "")
         
         if selected_domain:
-            # Filter data based on domain selection
-            if selected_domain == "All Domains":
-                # Use all data
-                all_data = []
-                for file_data in st.session_state.uploaded_files_data.values():
-                    all_data.append(file_data['data'])
-                
-                if all_data:
-                    combined_df = pd.concat(all_data, ignore_index=True)
-                else:
-                    combined_df = pd.DataFrame()
-            else:
-                # Filter for selected domain
-                domain_data = []
-                for file_data in st.session_state.uploaded_files_data.values():
-                    if file_data['domain'] == selected_domain:
-                        domain_data.append(file_data['data'])
-                
-                if domain_data:
-                    combined_df = pd.concat(domain_data, ignore_index=True)
-                else:
-                    combined_df = pd.DataFrame()
+            # Use the combined data prebuilt at upload time for the selected domain
+            combined_df = _domain_frame(selected_domain)
             
             # Further filter based on URL path if provided
             if url_path and not combined_df.empty and 'page' in combined_df.columns:
-                combined_df = combined_df[combined_df['page'].str.contains(url_path, case=False, na=False)]
+                combined_df, summary = _filter_by_url(selected_domain, url_path)
+            else:
+                # Unfiltered views reuse the per-file summaries computed at ingestion
+                summary = combine_summaries([
+                    file_data['summary'] for file_data in st.session_state.uploaded_files_data.values()
+                    if selected_domain == "All Domains" or file_data['domain'] == selected_domain
+                ])
             
             if not combined_df.empty:
                 # Display metrics
@@ -308,15 +300,14 @@ with tab3:
                 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Total Queries", len(combined_df))
+                    st.metric("Total Queries", summary['n_queries'])
                 with col2:
-                    st.metric("Total Clicks", int(combined_df['clicks'].sum()))
+                    st.metric("Total Clicks", summary['total_clicks'])
                 with col3:
-                    st.metric("AI Overview Clicks", int(combined_df['ai_overview_clicks'].sum()))
+                    st.metric("AI Overview Clicks", summary['total_ai_clicks'])
                 with col4:
-                    if combined_df['clicks'].sum() > 0:
-                        ai_click_percentage = (combined_df['ai_overview_clicks'].sum() / combined_df['clicks'].sum()) * 100
-                        st.metric("AI Overview %", f"{ai_click_percentage:.2f}%")
+                    if summary['ai_pct'] is not None:
+                        st.metric("AI Overview %", f"{summary['ai_pct']:.2f}%")
                     else:
                         st.metric("AI Overview %", "N/A")
                 
@@ -325,68 +316,33 @@ with tab3:
                     st.subheader("AI Overview Trend")
                     
                     # Group by date
-                    date_df = combined_df.groupby('date').agg({
-                        'clicks': 'sum',
-                        'impressions': 'sum',
-                        'ai_overview_clicks': 'sum'
-                    }).reset_index()
+                    date_df = sum_by_group(combined_df['date'], combined_df[['clicks', 'impressions', 'ai_overview_clicks']])
                     
                     # Calculate AI Overview percentage
-                    date_df['ai_overview_percentage'] = (date_df['ai_overview_clicks'] / date_df['clicks'] * 100).fillna(0)
+                    date_df['ai_overview_percentage'] = safe_percentage(date_df['ai_overview_clicks'].to_numpy(), date_df['clicks'].to_numpy())
                     
                     # Create time series chart
-                    fig = px.line(
-                        date_df,
-                        x='date',
-                        y=['clicks', 'ai_overview_clicks'],
-                        title="AI Overview Clicks vs Total Clicks Over Time",
-                        labels={'value': 'Count', 'date': 'Date', 'variable': 'Metric'},
-                        color_discrete_map={'clicks': 'blue', 'ai_overview_clicks': 'red'}
-                    )
+                    fig = charts.clicks_trend_line(date_df)
                     st.plotly_chart(fig, use_container_width=True)
                     
                     # AI Overview percentage trend
-                    fig2 = px.line(
-                        date_df,
-                        x='date',
-                        y='ai_overview_percentage',
-                        title="AI Overview Percentage Over Time",
-                        labels={'ai_overview_percentage': 'AI Overview %', 'date': 'Date'}
-                    )
-                    fig2.update_traces(line_color='red')
+                    fig2 = charts.percentage_trend_line(date_df)
                     st.plotly_chart(fig2, use_container_width=True)
                 
                 # Page level analysis if page column exists
                 if 'page' in combined_df.columns and selected_domain != "All Domains":
                     st.subheader("Top Pages Affected by AI Overview")
                     
-                    # Group by page
-                    page_df = combined_df.groupby('page').agg({
-                        'clicks': 'sum',
-                        'impressions': 'sum',
-                        'ai_overview_clicks': 'sum',
-                    }).reset_index()
-                    
-                    # Calculate AI Overview percentage
-                    page_df['ai_overview_percentage'] = (page_df['ai_overview_clicks'] / page_df['clicks'] * 100).fillna(0)
+                    # Group by page and select the top pages by AI Overview clicks
+                    page_df = combined_df.groupby('page', observed=True)[['clicks', 'impressions', 'ai_overview_clicks']].sum()
+                    top_pages = page_df.nlargest(10, 'ai_overview_clicks').reset_index()
                     
-                    # Sort by AI Overview clicks
-                    top_pages = page_df.sort_values('ai_overview_clicks', ascending=False).head(10)
+                    # Calculate AI Overview percentage for the selected pages only
+                    top_pages['ai_overview_percentage'] = safe_percentage(top_pages['ai_overview_clicks'].to_numpy(), top_pages['clicks'].to_numpy())
                     
                     if not top_pages.empty:
                         # Create bar chart
-                        fig = px.bar(
-                            top_pages,
-                            x='ai_overview_clicks',
-                            y='page',
-                            orientation='h',
-                            title="Top Pages by AI Overview Clicks",
-                            labels={'ai_overview_clicks': 'AI Overview Clicks', 'page': 'Page'},
-                            color='ai_overview_percentage',
-                            color_continuous_scale='Reds',
-                        )
-                        
-                        fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+                        fig = charts.top_ai_overview_bar(top_pages, 'page', 'Page', "Top Pages by AI Overview Clicks")
                         st.plotly_chart(fig, use_container_width=True)
                         
                         # Display data table
@@ -399,10 +355,11 @@ with tab3:
                             'ai_overview_percentage': 'AI Overview %'
                         })
                         
-                        # Format percentages
-                        display_df['AI Overview %'] = display_df['AI Overview %'].apply(lambda x: f"{x:.2f}%")
-                        
-                        st.dataframe(display_df, use_container_width=True)
+                        st.dataframe(
+                            display_df,
+                            use_container_width=True,
+                            column_config={'AI Overview %': PERCENT_COLUMN}
+                        )
             else:
                 if url_path:
                     st.info(f"No data found for URL path containing '{url_path}'.")
@@ -410,7 +367,9 @@ with tab3:
                     st.info(f"No data available for the selected domain.")
 
 # Tab 4: Comparison Analytics
-with tab4:
+@st.fragment
+def render_tab4():
+    """Renders the Comparison Analytics tab; its widgets only rerun this fragment."""
     st.header("Compare Domains and Pages")
     
     if len(st.session_state.domains) < 2:
@@ -430,6 +389,8 @@ with tab4:
             comparison_data = compare_domains(st.session_state.uploaded_files_data, selected_domains)
             
             if comparison_data:
+                import plotly.express as px
+                
                 # Create overall metrics comparison
                 st.subheader("Overall Metrics Comparison")
                 
@@ -469,42 +430,36 @@ with tab4:
                     common_queries_df = pd.DataFrame(comparison_data['common_queries'])
                     st.dataframe(common_queries_df, use_container_width=True)
                     
+                    # Index rows by query once; the keys double as the selectbox options
+                    query_rows = common_queries_df.groupby('Query', sort=False).indices
+                    
                     # Visualization for common queries
                     selected_query = st.selectbox(
                         "Select a query to compare across domains:",
-                        options=common_queries_df['Query'].unique()
+                        options=list(query_rows)
                     )
                     
                     if selected_query:
-                        query_data = common_queries_df[common_queries_df['Query'] == selected_query]
+                        query_data = common_queries_df.iloc[query_rows[selected_query]]
                         
-                        # Create visualization
-                        fig = go.Figure()
-                        
-                        for domain in selected_domains:
-                            domain_data = query_data[query_data['Domain'] == domain]
-                            if not domain_data.empty:
-                                fig.add_trace(go.Bar(
-                                    name=f"{domain} - Total Clicks",
-                                    x=[domain],
-                                    y=domain_data['Clicks'],
-                                    marker_color='blue',
-                                    opacity=0.7
-                                ))
-                                
-                                fig.add_trace(go.Bar(
-                                    name=f"{domain} - AI Overview Clicks",
-                                    x=[domain],
-                                    y=domain_data['AI Overview Clicks'],
-                                    marker_color='red',
-                                    opacity=0.7
-                                ))
+                        # Create visualization with one grouped bar per domain and metric
+                        long_df = query_data.melt(
+                            id_vars=['Domain'],
+                            value_vars=['Clicks', 'AI Overview Clicks'],
+                            var_name='Metric',
+                            value_name='Count'
+                        )
                         
-                        fig.update_layout(
-                            title=f"Comparison for Query: '{selected_query}'",
+                        fig = px.bar(
+                            long_df,
+                            x='Domain',
+                            y='Count',
+                            color='Metric',
                             barmode='group',
-                            xaxis_title="Domain",
-                            yaxis_title="Clicks"
+                            title=f"Comparison for Query: '{selected_query}'",
+                            labels={'Count': 'Clicks'},
+                            color_discrete_map={'Clicks': 'blue', 'AI Overview Clicks': 'red'},
+                            opacity=0.7
                         )
                         
                         st.plotly_chart(fig, use_container_width=True)
@@ -523,3 +478,20 @@ with tab4:
                         fig2.update_layout(yaxis={'autorange': 'reversed'})
                         
                         st.plotly_chart(fig2, use_container_width=True)
+
+# Create tabs for different functionalities
+tab1, tab2, tab3, tab4 = st.tabs([
+    "Upload & Analyze Data", 
+    "Keyword Analysis", 
+    "Domain/URL Analysis", 
+    "Comparison Analytics"
+])
+
+with tab1:
+    render_tab1()
+with tab2:
+    render_tab2()
+with tab3:
+    render_tab3()
+with tab4:
+    render_tab4()
@@ -0,0 +1,128 @@
+import streamlit as st
+
+# Figures are cached as shared resources keyed on the hashed input DataFrame,
+# so reruns with unchanged inputs skip Plotly figure assembly entirely. Plotly is
+# imported inside each builder to keep it off the app's cold-start path.
+
+@st.cache_resource(max_entries=64)
+def top_ai_overview_bar(df, category, category_label, title):
+    """
+    Builds a horizontal bar chart of AI Overview clicks per category, shaded by AI Overview %.
+
+    Args:
+        df (DataFrame): Rows to plot, with 'ai_overview_clicks' and 'ai_overview_percentage' columns
+        category (str): Column holding the bar labels (e.g. 'query' or 'page')
+        category_label (str): Axis label for the category column
+        title (str): Chart title
+
+    Returns:
+        Figure: The Plotly figure
+    """
+    import plotly.express as px
+
+    fig = px.bar(
+        df,
+        x='ai_overview_clicks',
+        y=category,
+        orientation='h',
+        title=title,
+        labels={'ai_overview_clicks': 'AI Overview Clicks', category: category_label},
+        color='ai_overview_percentage',
+        color_continuous_scale='Reds',
+    )
+
+    fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+@st.cache_resource(max_entries=64)
+def keyword_domain_bar(keyword_df, keyword):
+    """
+    Builds a bar chart comparing AI Overview clicks per domain for a keyword.
+
+    Args:
+        keyword_df (DataFrame): Keyword results with 'Domain' and 'AI Overview Clicks' columns
+        keyword (str): The analyzed keyword
+
+    Returns:
+        Figure: The Plotly figure
+    """
+    import plotly.express as px
+
+    return px.bar(
+        keyword_df,
+        x='Domain',
+        y='AI Overview Clicks',
+        title=f"AI Overview Clicks Comparison for '{keyword}'",
+        color='Domain'
+    )
+
+@st.cache_resource(max_entries=64)
+def keyword_position_scatter(keyword_df, keyword):
+    """
+    Builds a scatter plot of position against AI Overview % for a keyword.
+
+    Args:
+        keyword_df (DataFrame): Keyword results with numeric 'Position' and 'AI Overview %' columns
+        keyword (str): The analyzed keyword
+
+    Returns:
+        Figure: The Plotly figure
+    """
+    import plotly.express as px
+
+    return px.scatter(
+        keyword_df,
+        x='Position',
+        y='AI Overview %',
+        size='Clicks',
+        color='Domain',
+        hover_data=['Impressions', 'CTR'],
+        title=f"Position vs AI Overview % for '{keyword}'"
+    )
+
+@st.cache_resource(max_entries=64)
+def clicks_trend_line(date_df):
+    """
+    Builds a time series of total clicks against AI Overview clicks.
+
+    Args:
+        date_df (DataFrame): Per-date totals with 'date', 'clicks' and 'ai_overview_clicks' columns
+
+    Returns:
+        Figure: The Plotly figure
+    """
+    import plotly.express as px
+
+    return px.line(
+        date_df,
+        x='date',
+        y=['clicks', 'ai_overview_clicks'],
+        title="AI Overview Clicks vs Total Clicks Over Time",
+        labels={'value': 'Count', 'date': 'Date', 'variable': 'Metric'},
+        color_discrete_map={'clicks': 'blue', 'ai_overview_clicks': 'red'},
+        render_mode='webgl'
+    )
+
+@st.cache_resource(max_entries=64)
+def percentage_trend_line(date_df):
+    """
+    Builds a time series of the AI Overview percentage.
+
+    Args:
+        date_df (DataFrame): Per-date totals with 'date' and 'ai_overview_percentage' columns
+
+    Returns:
+        Figure: The Plotly figure
+    """
+    import plotly.express as px
+
+    fig = px.line(
+        date_df,
+        x='date',
+        y='ai_overview_percentage',
+        title="AI Overview Percentage Over Time",
+        labels={'ai_overview_percentage': 'AI Overview %', 'date': 'Date'},
+        render_mode='webgl'
+    )
+    fig.update_traces(line_color='red')
+    return fig
@@ -0,0 +1,160 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import io
+import pyarrow.csv as pacsv
+import os.path
+import hashlib
+from pandas.api.types import union_categoricals
+from utils import validate_search_console_arrow, process_search_data, summarize_search_data
+
+# Sample files bundled with the repository for demonstration purposes
+SAMPLE_FILES = ["sample_data.csv", "sample_data_domain2.csv"]
+
+# Bounded because the cache is shared by every session: each entry holds a whole processed
+# upload, so keep the most recent few and let stale ones expire after an hour
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def ingest_csv(digest: str, _content: bytes) -> tuple[str, pd.DataFrame, dict, dict]:
+    """
+    Reads, validates and processes a Search Console CSV, memoized on its content digest.
+
+    Args:
+        digest (str): Content digest of the file, used as the cache key
+        _content (bytes): The raw CSV file content (not hashed by the cache)
+
+    Returns:
+        tuple: (domain, processed_df, summary, query_index) - Domain name, processed DataFrame,
+            headline metrics and a mapping of lowercased query to row positions
+    """
+    # Treat blank text cells as missing, so a blank "5%"-style CTR reads as NaN rather than ''
+    table = pacsv.read_csv(
+        io.BytesIO(_content),
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+    )
+
+    # Check if it's a valid Search Console export while the columns are still Arrow buffers
+    is_valid, message, table = validate_search_console_arrow(table)
+    if not is_valid:
+        raise ValueError(message)
+
+    # Convert once at the end; the dictionary-encoded query column arrives as a category
+    df = table.to_pandas()
+
+    # Blank count cells mean nothing was recorded; count them as zero so the int32 casts below can't fail
+    counts = [col for col in ['clicks', 'impressions', 'ai_overview_clicks'] if col in df.columns]
+    df[counts] = df[counts].fillna(0)
+
+    domain, processed_data = process_search_data(df, assume_lower=True)
+
+    # Search Console counts fit in int32 and rates/positions in float32, halving memory per column
+    for col in ['clicks', 'impressions', 'ai_overview_clicks']:
+        processed_data[col] = processed_data[col].astype(np.int32)
+    for col in ['position', 'ctr']:
+        processed_data[col] = processed_data[col].astype(np.float32)
+
+    # Pages repeat across dates, so dictionary-encode them like queries for cheaper groupbys
+    if 'page' in processed_data.columns:
+        processed_data['page'] = processed_data['page'].astype('category')
+        # Case-fold pages once so URL path filtering is a plain substring test
+        processed_data['page_lower'] = processed_data['page'].str.lower().astype('category')
+
+    # Index rows by lowercased query so keyword lookups don't rescan the column
+    query_index = processed_data.groupby(processed_data['query'].str.lower(), sort=False).indices
+
+    return domain, processed_data, summarize_search_data(processed_data), query_index
+
+def _append_frame(combined, df):
+    """
+    Appends a processed DataFrame to a combined one, treating a missing or empty frame as no data.
+
+    Args:
+        combined (DataFrame): The combined data so far, or None
+        df (DataFrame): The processed data to append
+
+    Returns:
+        DataFrame: The combined data including df
+    """
+    if combined is None or combined.empty:
+        return df
+
+    # Concatenating categoricals with different categories decays them to strings,
+    # so stack the other columns and merge the category dictionaries separately
+    categorical = [
+        col for col in df.columns
+        if col in combined.columns
+        and isinstance(df[col].dtype, pd.CategoricalDtype)
+        and isinstance(combined[col].dtype, pd.CategoricalDtype)
+    ]
+    stacked = pd.concat([combined.drop(columns=categorical), df.drop(columns=categorical)], ignore_index=True)
+    for col in categorical:
+        stacked[col] = union_categoricals([combined[col], df[col]])
+
+    # Restore the column order a plain concat would have produced
+    return stacked[list(dict.fromkeys([*combined.columns, *df.columns]))]
+
+def store_file_data(name, content):
+    """
+    Ingests a CSV file and stores the processed data in the session state, keyed by content digest.
+
+    Identical content is only processed once, and different files sharing a name don't collide.
+    Content uploaded again under another name stays listed under the name it was first stored as.
+
+    Args:
+        name (str): The file name, kept for display
+        content (bytes): The raw CSV file content
+
+    Returns:
+        tuple: (domain, stored_name) - The domain extracted from the file and the name its
+            content is stored under, which differs from name for a duplicate
+    """
+    digest = hashlib.blake2b(content, digest_size=8).hexdigest()
+
+    if digest in st.session_state.uploaded_files_data:
+        file_data = st.session_state.uploaded_files_data[digest]
+        return file_data['domain'], file_data['file_name']
+
+    domain, processed_data, summary, query_index = ingest_csv(digest, content)
+
+    if domain not in st.session_state.domains:
+        st.session_state.domains.append(domain)
+
+    # Store the processed data
+    st.session_state.uploaded_files_data[digest] = {
+        'file_name': name,
+        'domain': domain,
+        'data': processed_data,
+        'summary': summary,
+        'query_index': query_index
+    }
+
+    # Extend the combined views incrementally so readers never re-concatenate every file
+    st.session_state.combined_all = _append_frame(st.session_state.combined_all, processed_data)
+    st.session_state.combined_by_domain[domain] = _append_frame(
+        st.session_state.combined_by_domain.get(domain), processed_data
+    )
+
+    return domain, name
+
+def load_samples():
+    """
+    Loads the bundled sample files into the session state.
+
+    Returns:
+        tuple: (loaded, errors) - Lists of (file_name, domain) and (file_name, message) pairs
+    """
+    loaded = []
+    errors = []
+
+    for file_name in SAMPLE_FILES:
+        if not os.path.exists(file_name):
+            continue
+
+        try:
+            with open(file_name, 'rb') as f:
+                content = f.read()
+            domain, _ = store_file_data(file_name, content)
+            loaded.append((file_name, domain))
+        except Exception as e:
+            errors.append((file_name, str(e)))
+
+    return loaded, errors
@@ -1,7 +1,56 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from urllib.parse import urlparse
 import re
+from pandas.api.types import union_categoricals
+from functools import lru_cache
+
+# Columns every Search Console export must provide, built once per process
+REQUIRED_COLUMNS = frozenset(['query', 'clicks', 'impressions', 'ctr', 'position'])
+
+@lru_cache(maxsize=1024)
+def _netloc(url):
+    """
+    Extracts the network location (domain) from a URL, memoized across files and reruns.
+    
+    Args:
+        url (str): The URL to parse
+        
+    Returns:
+        str: The URL's netloc
+    """
+    return urlparse(url).netloc
+
+def _clean_ctr(ctr):
+    """
+    Converts a CTR column to float32, stripping a trailing "%" when it was read as text.
+    
+    Args:
+        ctr (Series): The CTR column, numeric or percentage strings like "10.5%"
+        
+    Returns:
+        Series: The CTR values as float32
+    """
+    # Numeric columns skip the .str accessor, which would materialize every cell as a string
+    if pd.api.types.is_numeric_dtype(ctr):
+        return ctr.astype('float32')
+    return ctr.str.removesuffix('%').astype('float32')
+
+def _replace_column(table, name, column):
+    """
+    Returns a copy of an Arrow table with one column swapped out, keeping its position.
+    
+    Args:
+        table (Table): The pyarrow Table
+        name (str): Name of the column to replace
+        column (Array): The new column values
+        
+    Returns:
+        Table: The updated table
+    """
+    return table.set_column(table.schema.get_field_index(name), name, column)
 
 def validate_search_console_csv(df):
     """
@@ -13,72 +62,215 @@ def validate_search_console_csv(df):
     Returns:
         tuple: (is_valid, message) - Boolean indicating if the file is valid and a message
     """
-    required_columns = ['query', 'clicks', 'impressions', 'ctr', 'position']
-    
     # Check if the required columns exist (case insensitive)
-    df.columns = [col.lower() for col in df.columns]
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    if any(col != col.lower() for col in df.columns):
+        df.columns = df.columns.str.lower()
+    missing_columns = REQUIRED_COLUMNS.difference(df.columns)
     
     if missing_columns:
-        return False, f"Missing required columns: {', '.join(missing_columns)}"
+        return False, f"Missing required columns: {', '.join(sorted(missing_columns))}"
     
-    # Ensure data types
+    # Ensure data types, using the smallest dtypes that fit to reduce memory traffic downstream
     try:
-        df['clicks'] = pd.to_numeric(df['clicks'])
-        df['impressions'] = pd.to_numeric(df['impressions'])
+        df['clicks'] = pd.to_numeric(df['clicks'], downcast='unsigned')
+        df['impressions'] = pd.to_numeric(df['impressions'], downcast='unsigned')
         
         # Some GSC CSVs have CTR as percentage string like "10.5%"
-        if df['ctr'].dtype == object:
-            df['ctr'] = df['ctr'].str.rstrip('%').astype(float)
+        df['ctr'] = _clean_ctr(df['ctr'])
         
-        df['position'] = pd.to_numeric(df['position'])
+        df['position'] = pd.to_numeric(df['position'], downcast='float')
     except Exception as e:
         return False, f"Error converting data types: {str(e)}"
     
+    # Queries repeat across rows and dates, so dictionary-encode them for faster groupbys
+    if df['query'].dtype != 'category':
+        df['query'] = df['query'].astype('category')
+    
     return True, "CSV file is valid"
 
-def process_search_data(df):
+def validate_search_console_arrow(table):
+    """
+    Validates a Search Console export read as an Arrow table, converting its columns without pandas.
+    
+    Args:
+        table (Table): The pyarrow Table containing the CSV data
+        
+    Returns:
+        tuple: (is_valid, message, table) - Boolean indicating if the file is valid, a message and
+            the table with lowercase column names and converted columns
+    """
+    # Check if the required columns exist (case insensitive)
+    if any(col != col.lower() for col in table.column_names):
+        table = table.rename_columns([col.lower() for col in table.column_names])
+    missing_columns = REQUIRED_COLUMNS.difference(table.column_names)
+    
+    if missing_columns:
+        return False, f"Missing required columns: {', '.join(sorted(missing_columns))}", table
+    
+    # Ensure data types with Arrow compute kernels on the column buffers
+    try:
+        table = _replace_column(table, 'clicks', pc.cast(table['clicks'], pa.uint32()))
+        table = _replace_column(table, 'impressions', pc.cast(table['impressions'], pa.uint32()))
+        
+        # Some GSC CSVs have CTR as percentage string like "10.5%"
+        ctr = table['ctr']
+        if pa.types.is_string(ctr.type) or pa.types.is_large_string(ctr.type):
+            ctr = pc.utf8_rtrim(ctr, characters='%')
+        table = _replace_column(table, 'ctr', pc.cast(ctr, pa.float32()))
+        
+        table = _replace_column(table, 'position', pc.cast(table['position'], pa.float32()))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        return False, f"Error converting data types: {str(e)}", table
+    
+    # Dictionary-encode queries as text so they convert to a pandas category without rehashing;
+    # the CSV reader infers numbers for all-numeric queries, so cast those back to strings first
+    query = table['query']
+    if not (pa.types.is_dictionary(query.type) and pa.types.is_string(query.type.value_type)):
+        table = _replace_column(table, 'query', pc.dictionary_encode(pc.cast(query, pa.string())))
+    
+    return True, "CSV file is valid", table
+
+def process_search_data(df, assume_lower=False, rng=None):
     """
     Processes Search Console data to extract domain and add AI Overview columns.
     
     Args:
         df (DataFrame): The pandas DataFrame containing the validated CSV data
+        assume_lower (bool): Skip lowercasing column names, e.g. when a validate_search_console_* function already did
+        rng (Generator): Optional NumPy random generator; when given, missing AI Overview clicks are
+            sampled binomially instead of estimated deterministically
         
     Returns:
         tuple: (domain, processed_df) - Domain name and processed DataFrame
     """
     # Make column names lowercase
-    df.columns = [col.lower() for col in df.columns]
+    if not assume_lower and any(col != col.lower() for col in df.columns):
+        df.columns = df.columns.str.lower()
     
     # Extract domain from page column if available
     domain = "Unknown"
     if 'page' in df.columns and not df['page'].empty:
-        first_url = df['page'].iloc[0]
-        parsed_url = urlparse(first_url)
-        domain = parsed_url.netloc
+        # Read the first value straight from the backing array, bypassing the positional indexer
+        first_url = df['page'].array[0]
+        # A blank page column reads as None (or NaN), which urlparse would turn into b''
+        if isinstance(first_url, str) and first_url:
+            domain = _netloc(first_url)
     
     # If AI Overview clicks column doesn't exist, we need to estimate it
     if 'ai_overview_clicks' not in df.columns:
         # Estimate AI Overview clicks as a portion of total clicks
         # This is a placeholder - in real usage, you'd need actual data
-        df['ai_overview_clicks'] = np.random.binomial(
-            df['clicks'].astype(int).values, 
-            np.clip(1.0 / (df['position'].values + 1), 0, 0.5)
-        )
-        df['ai_overview_clicks'] = df['ai_overview_clicks'].astype(int)
+        pos = df['position'].to_numpy(dtype=np.float32, copy=False)
+        p = np.minimum(np.float32(0.5), np.float32(1.0) / (pos + np.float32(1.0)))
+        # Rows without a position get no AI Overview share rather than a NaN probability
+        p[~np.isfinite(p)] = 0
+        
+        if rng is None:
+            # Expected value of the share, rounded: reproducible and a single vectorized pass
+            clicks = df['clicks'].to_numpy(dtype=np.float32, copy=False)
+            df['ai_overview_clicks'] = np.rint(clicks * p).astype(np.int32, copy=False)
+        else:
+            df['ai_overview_clicks'] = rng.binomial(df['clicks'].to_numpy(dtype=np.int64, copy=False), p).astype(np.int32)
     
-    # Calculate AI Overview click percentage
-    df['ai_overview_percentage'] = (df['ai_overview_clicks'] / df['clicks'] * 100).fillna(0)
+    # Calculate AI Overview click percentage straight from the column buffers in float32,
+    # skipping index alignment, float64 temporaries and NaNs for rows without clicks
+    df['ai_overview_percentage'] = safe_percentage(df['ai_overview_clicks'], df['clicks'], dtype=np.float32)
     
     # Format CTR as numeric if it's a string
-    if df['ctr'].dtype == object:
-        df['ctr'] = df['ctr'].str.rstrip('%').astype(float)
+    if not pd.api.types.is_float_dtype(df['ctr']):
+        df['ctr'] = _clean_ctr(df['ctr'])
     
-    # Sort by AI Overview clicks (descending)
-    df = df.sort_values('ai_overview_clicks', ascending=False)
+    # Sort by AI Overview clicks (descending), stable so ties keep file order on every run,
+    # and without carrying the old index along
+    df = df.sort_values('ai_overview_clicks', ascending=False, kind='stable', ignore_index=True)
     
     return domain, df
 
+def safe_percentage(numerator, denominator, dtype=np.float64):
+    """
+    Computes numerator / denominator * 100 element-wise, yielding 0 where the denominator is not positive.
+    
+    Args:
+        numerator (array-like): Values to divide, e.g. AI Overview clicks
+        denominator (array-like): Values to divide by, e.g. total clicks
+        dtype (dtype): Float dtype of the result
+        
+    Returns:
+        ndarray: Float percentages
+    """
+    numerator = np.asarray(numerator, dtype=dtype)
+    denominator = np.asarray(denominator, dtype=dtype)
+    out = np.zeros(numerator.shape, dtype=dtype)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    out *= 100
+    return out
+
+def summarize_search_data(df):
+    """
+    Computes the headline AI Overview metrics for a processed DataFrame.
+    
+    Args:
+        df (DataFrame): The pandas DataFrame returned by process_search_data
+        
+    Returns:
+        dict: Query count, total clicks, total AI Overview clicks and AI Overview percentage
+    """
+    # Reduce the NumPy buffers directly, skipping pandas' per-call reduction dispatch
+    total_clicks = int(df['clicks'].to_numpy().sum())
+    total_ai_clicks = int(df['ai_overview_clicks'].to_numpy().sum())
+    
+    return {
+        'n_queries': len(df),
+        'total_clicks': total_clicks,
+        'total_ai_clicks': total_ai_clicks,
+        'ai_pct': (total_ai_clicks / total_clicks) * 100 if total_clicks > 0 else None
+    }
+
+def combine_summaries(summaries):
+    """
+    Combines per-file summaries into a single summary without touching the underlying rows.
+    
+    Args:
+        summaries (list): List of dicts returned by summarize_search_data
+        
+    Returns:
+        dict: Combined summary in the same format
+    """
+    total_clicks = sum(summary['total_clicks'] for summary in summaries)
+    total_ai_clicks = sum(summary['total_ai_clicks'] for summary in summaries)
+    
+    return {
+        'n_queries': sum(summary['n_queries'] for summary in summaries),
+        'total_clicks': total_clicks,
+        'total_ai_clicks': total_ai_clicks,
+        'ai_pct': (total_ai_clicks / total_clicks) * 100 if total_clicks > 0 else None
+    }
+
+def sum_by_group(keys, values):
+    """
+    Sums integer columns per group key using np.bincount over factorized key codes.
+    
+    Equivalent to values.groupby(keys).sum().reset_index() but without pandas'
+    per-group dispatch overhead. Rows with a missing key are dropped.
+    
+    Args:
+        keys (Series): Group key for each row
+        values (DataFrame): Integer columns to sum, aligned with keys
+        
+    Returns:
+        DataFrame: One row per key in sorted order, with the key column followed by the sums
+    """
+    codes, uniques = pd.factorize(keys, sort=True)
+    valid = codes >= 0
+    codes = codes[valid]
+    
+    result = {keys.name: uniques}
+    for col in values.columns:
+        weights = values[col].to_numpy()[valid]
+        result[col] = np.bincount(codes, weights=weights, minlength=len(uniques)).astype(np.int64)
+    
+    return pd.DataFrame(result)
+
 def compare_domains(all_data, domains_to_compare):
     """
     Compares AI Overview metrics across different domains.
@@ -88,75 +280,85 @@ def compare_domains(all_data, domains_to_compare):
         domains_to_compare (list): List of domains to compare
         
     Returns:
-        dict: Comparison results
+        dict: Comparison results, or None if fewer than 2 of the domains have data
     """
-    if not domains_to_compare or len(domains_to_compare) < 2:
+    # Hash the selection once for constant-time membership tests; repeated entries don't count twice
+    domain_set = frozenset(domains_to_compare or ())
+    if len(domain_set) < 2:
         return None
     
     # Collect data for each domain
-    domain_data = {}
-    for file_name, file_data in all_data.items():
-        domain = file_data['domain']
-        if domain in domains_to_compare:
-            if domain not in domain_data:
-                domain_data[domain] = []
-            domain_data[domain].append(file_data['data'])
-    
-    # Combine data for each domain
-    for domain in domain_data:
-        if domain_data[domain]:
-            domain_data[domain] = pd.concat(domain_data[domain], ignore_index=True)
-    
-    # Calculate overall metrics for each domain
-    overall_metrics = []
-    for domain, df in domain_data.items():
-        if not df.empty:
-            total_clicks = int(df['clicks'].sum())
-            total_impressions = int(df['impressions'].sum())
-            ai_overview_clicks = int(df['ai_overview_clicks'].sum())
-            
-            ai_overview_percentage = 0
-            if total_clicks > 0:
-                ai_overview_percentage = (ai_overview_clicks / total_clicks) * 100
-            
-            avg_position = float(df['position'].mean())
-            
-            overall_metrics.append({
-                'Domain': domain,
-                'Total Clicks': total_clicks,
-                'Total Impressions': total_impressions,
-                'AI Overview Clicks': ai_overview_clicks,
-                'AI Overview %': ai_overview_percentage,
-                'Average Position': avg_position
-            })
-    
-    # Find common queries across domains
-    common_queries = []
-    
-    # Get all queries from all domains
-    all_queries = set()
-    for domain, df in domain_data.items():
-        all_queries.update(df['query'].unique())
-    
-    # For each query, check if it appears in multiple domains
-    for query in all_queries:
-        query_domains = []
-        for domain, df in domain_data.items():
-            domain_query_data = df[df['query'] == query]
-            if not domain_query_data.empty:
-                query_domains.append({
-                    'Domain': domain,
-                    'Query': query,
-                    'Clicks': int(domain_query_data['clicks'].sum()),
-                    'Impressions': int(domain_query_data['impressions'].sum()),
-                    'AI Overview Clicks': int(domain_query_data['ai_overview_clicks'].sum()),
-                    'AI Overview %': float((domain_query_data['ai_overview_clicks'].sum() / domain_query_data['clicks'].sum()) * 100 if domain_query_data['clicks'].sum() > 0 else 0),
-                    'Position': float(domain_query_data['position'].mean())
-                })
-        
-        # Add to common queries if it appears in at least 2 domains
-        if len(query_domains) >= 2:
-            common_queries.extend(query_domains)
+    # Domains were parsed once at upload time, so select the stored frames by them directly
+    selected = [
+        file_data for file_data in all_data.values()
+        if file_data['domain'] in domain_set and not file_data['data'].empty
+    ]
+    
+    # Nothing to compare unless at least 2 domains actually have rows
+    if len({file_data['domain'] for file_data in selected}) < 2:
+        return None
+    
+    frames = [file_data['data'] for file_data in selected]
+    
+    # Merge the per-file query dictionaries once, so the stacked column stays categorical
+    # instead of decaying to strings when the files' categories differ
+    queries = [df['query'] for df in frames]
+    if all(isinstance(query.dtype, pd.CategoricalDtype) for query in queries):
+        query = union_categoricals(queries)
+    else:
+        query = pd.Categorical(pd.concat(queries, ignore_index=True))
+    
+    # Stack all files into one frame for vectorized aggregation
+    combined = pd.concat([df.drop(columns='query') for df in frames], ignore_index=True)
+    combined['query'] = query
+    
+    # Tag rows with their domain as category codes, without materializing a string per row
+    domain_names, domain_codes = np.unique([file_data['domain'] for file_data in selected], return_inverse=True)
+    combined['Domain'] = pd.Categorical.from_codes(
+        np.repeat(domain_codes, [len(df) for df in frames]), categories=domain_names
+    )
+    
+    # Aggregate each (query, domain) pair in one pass over the rows; position is carried as
+    # a sum and count so both per-query and per-domain averages derive from this result
+    query_metrics = combined.groupby(['query', 'Domain'], sort=False, observed=True).agg(
+        Clicks=('clicks', 'sum'),
+        Impressions=('impressions', 'sum'),
+        AI_Overview_Clicks=('ai_overview_clicks', 'sum'),
+        Position_Sum=('position', 'sum'),
+        Position_Count=('position', 'count')
+    ).reset_index()
+    
+    # Calculate overall metrics for each domain by rolling up the much smaller pair table
+    domain_metrics = query_metrics.groupby('Domain', sort=False, observed=True).agg(**{
+        'Total Clicks': ('Clicks', 'sum'),
+        'Total Impressions': ('Impressions', 'sum'),
+        'AI Overview Clicks': ('AI_Overview_Clicks', 'sum'),
+        'Position_Sum': ('Position_Sum', 'sum'),
+        'Position_Count': ('Position_Count', 'sum')
+    }).reset_index()
+    totals = ['Total Clicks', 'Total Impressions', 'AI Overview Clicks']
+    domain_metrics[totals] = domain_metrics[totals].astype('int64')
+    domain_metrics['AI Overview %'] = safe_percentage(domain_metrics['AI Overview Clicks'], domain_metrics['Total Clicks'])
+    domain_metrics['Average Position'] = domain_metrics['Position_Sum'] / domain_metrics['Position_Count']
+    
+    overall_metrics = domain_metrics[[
+        'Domain', 'Total Clicks', 'Total Impressions', 'AI Overview Clicks', 'AI Overview %', 'Average Position'
+    ]].to_dict('records')
+    
+    # Find common queries across domains from the same pair table
+    query_metrics['Position'] = query_metrics['Position_Sum'] / query_metrics['Position_Count']
+    query_metrics['AI Overview %'] = safe_percentage(query_metrics['AI_Overview_Clicks'], query_metrics['Clicks'])
+    
+    # Keep queries that appear in at least 2 domains; each row is a distinct (query, domain) pair,
+    # so counting rows per query code gives the number of domains without another groupby
+    query_codes = query_metrics['query'].cat.codes.to_numpy()
+    domain_counts = np.bincount(query_codes)[query_codes]
+    query_metrics = query_metrics[domain_counts >= 2]
+    
+    common_queries = query_metrics.rename(columns={
+        'query': 'Query',
+        'AI_Overview_Clicks': 'AI Overview Clicks'
+    })[['Domain', 'Query', 'Clicks', 'Impressions', 'AI Overview Clicks', 'AI Overview %', 'Position']].to_dict('records')
     
     return {
         'overall_metrics': overall_metrics,